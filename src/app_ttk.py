@@ -8,12 +8,12 @@ from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
 
-from core.config import load_config, save_config, normalize_formats
+from core.config import load_config, save_config, normalize_formats, normalize_columns, split_filters
 from core.fetcher import DmwClient
-from core.transform import to_dataframe
+from core.transform import build_selector, to_dataframe
 from core.writer import save
 from core.schedule import is_windows, create_or_update, delete as delete_task
-from core.log import setup_logging
+from core.log import setup_logging_from_config
 
 APP_TITLE = "DMW Job Orders Exporter"
 
@@ -47,9 +47,12 @@ def open_folder(p: Path):
 
 def run_now(cfg: Dict[str, Any], month_value: str | None, log_cb, max_pages: int | None = None):
     client = DmwClient(api_base=cfg["api_base"], api_key=cfg.get("api_key", ""))
+    columns = normalize_columns(cfg.get("columns"))
+    params, filters = split_filters(cfg.get("filters") or {}, cfg.get("server_filters") or [])
     log_cb("Fetching meta & page 1 …")
-    rows = client.fetch_all(cfg["jobsite"], progress=log_cb, max_pages=max_pages)
-    df = to_dataframe(rows)
+    rows = client.fetch_all(cfg["jobsite"], progress=log_cb,
+                            params=params, select=build_selector(columns, filters), max_pages=max_pages)
+    df = to_dataframe(rows, columns)
     if df.empty:
         log_cb("No data returned. Nothing to write.")
         return []
@@ -58,7 +61,8 @@ def run_now(cfg: Dict[str, Any], month_value: str | None, log_cb, max_pages: int
         Path(cfg["output_dir"]),
         cfg["jobsite"],
         month_value,
-        normalize_formats(cfg.get("formats", ["csv"]))
+        normalize_formats(cfg.get("formats", ["csv"])),
+        xlsx_mode=cfg.get("xlsx_mode", "file"),
     )
     for f in written:
         log_cb(f"Wrote: {f.resolve()}")
@@ -66,8 +70,8 @@ def run_now(cfg: Dict[str, Any], month_value: str | None, log_cb, max_pages: int
 
 def main():
     base = base_dir()
-    setup_logging(base)
     cfg = load_config(base)
+    setup_logging_from_config(base, cfg)
 
     app = tb.Window(title=APP_TITLE, themename="cosmo")
     app.geometry("820x560")
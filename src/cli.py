@@ -1,21 +1,168 @@
 # src/cli.py
 from __future__ import annotations
 import argparse
-from datetime import date
+import json
+import logging
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
-from core.config import load_config
-from core.fetcher import DmwClient
-from core.transform import to_dataframe
-from core.writer import save
-from core.log import setup_logging
+from core.config import load_config, normalize_columns, split_filters
+from core.budget import FetchIncomplete, RunBudget, parse_deadline, parse_duration
+from core.fetcher import DmwClient, shard_range
+from core.transform import build_selector, to_dataframe
+from core.writer import (save, checkpoint_path, find_checkpoint, save_state, load_state, clear_partial,
+                         shard_path, find_shards)
+from core.log import setup_logging_from_config
+
+# Deadline hit (or a page failed in a deadline/resumed run): _PARTIAL outputs + checkpoint
+# written; rerun with --resume to finish. Shard runs exit with it too (shard file marked incomplete).
+EXIT_PARTIAL = 3
+
+class StaleCheckpoint(Exception):
+    """Page 1's meta no longer matches the checkpoint, so its page numbers would skip or repeat rows."""
+
+def check_resume_meta(ck: dict, meta: dict) -> None:
+    # Checkpoints from before per_page/meta_last_page were stored only compare what they have
+    was = {"total": ck["total"], "lastPage": ck.get("meta_last_page", ck["last_page"]),
+           "perPage": ck.get("per_page")}
+    now = {"total": int(meta.get("total") or 0), "lastPage": int(meta.get("lastPage") or 1),
+           "perPage": int(meta.get("perPage") or 0)}
+    changed = [f"{k} {was[k]} → {now[k]}" for k in was if was[k] is not None and was[k] != now[k]]
+    if changed:
+        raise StaleCheckpoint(", ".join(changed))
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        i, n = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}") from None
+    if not 1 <= i <= n:
+        raise argparse.ArgumentTypeError(f"shard index must be 1..{n}, got {i}")
+    return i, n
+
+def merge(args, cfg) -> int:
+    """Combine shard artifacts into the usual outputs, refusing anything incomplete or inconsistent."""
+    jobsite = cfg["jobsite"]
+    shard_dir = Path(args.dir) if args.dir else Path(cfg["output_dir"])
+    paths = find_shards(shard_dir, jobsite, args.month)
+    if not paths:
+        logging.error("Merge: no shard files for %s %s in %s", jobsite, args.month or "current month", shard_dir)
+        return 1
+    shards = sorted((load_state(x) for x in paths), key=lambda s: s["shard"])
+
+    problems = []
+    counts = {s["shards"] for s in shards}
+    if len(counts) > 1:
+        problems.append(f"mixed shard counts {sorted(counts)}")
+    else:
+        n = counts.pop()
+        have = [s["shard"] for s in shards]
+        missing = sorted(set(range(1, n + 1)) - set(have))
+        if missing:
+            problems.append(f"missing shards {missing} of {n}")
+        if len(have) != len(set(have)):
+            problems.append("duplicate shard files")
+    for key in ("total", "plan_last_page", "columns", "params", "filters"):
+        if len({json.dumps(s[key], sort_keys=True) for s in shards}) > 1:
+            problems.append(f"shards disagree on {key}: {[s[key] for s in shards] if key == 'total' else '…'}")
+    incomplete = [s["shard"] for s in shards if not s["complete"]]
+    if incomplete:
+        problems.append(f"incomplete shards {incomplete}")
+    # Without client-side filters every row the API counted must be here (only if the plan wasn't cut by --max-pages)
+    got = sum(len(s["rows"]) for s in shards)
+    if (not problems and not shards[0]["filters"]
+            and shards[0]["plan_last_page"] == shards[0].get("meta_last_page", shards[0]["plan_last_page"])
+            and got != shards[0]["total"]):
+        problems.append(f"shards hold {got} rows, API total says {shards[0]['total']}")
+    if not problems:
+        # ranges must tile 1..plan_last_page exactly (empty slices have first > last)
+        expect = 1
+        for s in shards:
+            if s["first_page"] != expect:
+                problems.append(f"shard {s['shard']} starts at page {s['first_page']}, expected {expect}")
+                break
+            expect = max(expect, s["last_page"] + 1)
+        else:
+            if expect != shards[0]["plan_last_page"] + 1:
+                problems.append(f"pages end at {expect - 1}, plan says {shards[0]['plan_last_page']}")
+    if problems:
+        logging.error("Merge refused: %s", "; ".join(problems))
+        return 1
+
+    month = shards[0]["month"]
+    columns = [tuple(c) for c in shards[0]["columns"]]
+    rows = [r for s in shards for r in s["rows"]]
+    logging.info("Merging %d shards: %d rows (API total said %d)", len(shards), len(rows), shards[0]["total"])
+    df = to_dataframe(rows, columns)
+    output_dir = Path(cfg["output_dir"])
+    if not df.empty:
+        for w in save(df, output_dir, jobsite, month, cfg.get("formats", ["csv"]),
+                      xlsx_mode=cfg.get("xlsx_mode", "file")):
+            logging.info("Wrote: %s", w)
+    clear_partial(output_dir, jobsite, month)
+    return 0
+
+def write_shard(args, cfg, meta, columns, params, filters, rows, stopped: FetchIncomplete | None = None) -> Path:
+    # Shard artifact: page slice + the page-1 plan it was cut from, so merge can verify coverage
+    plan_last = int(meta.get("lastPage") or 1)
+    if args.max_pages is not None:
+        plan_last = min(plan_last, args.max_pages)
+    first, last = shard_range(plan_last, *args.shard)
+    path = save_state(shard_path(Path(cfg["output_dir"]), cfg["jobsite"], args.month, *args.shard), {
+        "jobsite": cfg["jobsite"], "month": args.month,
+        "shard": args.shard[0], "shards": args.shard[1],
+        "first_page": first, "last_page": last, "plan_last_page": plan_last,
+        "meta_last_page": int(meta.get("lastPage") or 1),
+        "total": int(meta.get("total") or 0), "per_page": int(meta.get("perPage") or 0),
+        "columns": columns, "params": params, "filters": filters,
+        "complete": stopped is None, "next_page": stopped.next_page if stopped else None,
+        "stop_reason": str(stopped) if stopped else None,
+        "rows": rows,
+    })
+    if stopped is None:
+        logging.info("Shard %d/%d: pages %d–%d, %d rows → %s", *args.shard, first, last, len(rows), path)
+    else:
+        logging.warning("Shard %d/%d: %s (pages %d–%d); %s is marked incomplete, rerun this shard",
+                        *args.shard, stopped, first, last, path)
+    return path
 
 def main():
     p = argparse.ArgumentParser(description="DMW exporter (headless)")
     p.add_argument("--month", help="YYYY-MM for filename stamp (optional)")
     p.add_argument("--prev-month", action="store_true", help="Use previous month instead of current")
     p.add_argument("--max-pages", type=int, default=None, help="Limit pages (testing)")
+    p.add_argument("--columns", help='Comma-separated dotted paths, optionally aliased: "a.b=Alias,c" (overrides config)')
+    p.add_argument("--filter", action="append", default=[], metavar="PATH=V1|V2",
+                   help="Keep rows whose field matches one of the values; repeatable (adds to config filters)")
+    p.add_argument("--deadline", help="Finish by HH:MM (next occurrence) or YYYY-MM-DDTHH:MM")
+    p.add_argument("--time-budget", help="Finish within e.g. 90m, 2h, 1h30m (plain number = minutes)")
+    p.add_argument("--max-workers", type=int, default=None,
+                   help="Upper bound on concurrent page fetches under a deadline (default: config max_workers)")
+    p.add_argument("--max-rps", type=float, default=None,
+                   help="Request rate cap across all workers under a deadline (default: config max_rps)")
+    p.add_argument("--resume", nargs="?", const=True, default=None, metavar="CHECKPOINT",
+                   help="Continue a run that hit its deadline (default: this month's checkpoint in output_dir)")
+    p.add_argument("--shard", type=parse_shard, metavar="i/N",
+                   help="Fetch only slice i of N of the pages and write a shard file; combine with 'merge'")
+    sub = p.add_subparsers(dest="command", metavar="{merge}")
+    m = sub.add_parser("merge", help="Check shard files are complete and consistent, then write the usual outputs")
+    m.add_argument("--month", default=argparse.SUPPRESS,
+                   help="YYYY-MM the shards were stamped with (default: top-level --month, else current)")
+    m.add_argument("--dir", help="Folder holding the shard files (default: output_dir)")
     args = p.parse_args()
+    if args.shard and args.resume:
+        p.error("--shard cannot be combined with --resume; rerun the shard instead")
+
+    started = datetime.now()
+    deadline = None
+    try:
+        if args.deadline:
+            deadline = parse_deadline(args.deadline, started)
+        if args.time_budget:
+            by_budget = started + timedelta(seconds=parse_duration(args.time_budget))
+            deadline = min(deadline, by_budget) if deadline else by_budget
+    except ValueError as e:
+        p.error(str(e))
 
     # compute previous month if requested
     if args.prev_month:
@@ -23,17 +170,103 @@ def main():
         if m == 1: y, m = y - 1, 12
         args.month = f"{y}-{m:02d}"
 
-    # logs go next to exe or CWD; fine either way
-    setup_logging(Path.cwd())
     cfg = load_config(Path.cwd())  # path arg ignored now; loader is robust
+    # logs go next to exe or CWD; fine either way
+    setup_logging_from_config(Path.cwd(), cfg)
+    if args.command == "merge":
+        return merge(args, cfg)
+
+    try:
+        columns = normalize_columns(args.columns.split(",") if args.columns else cfg.get("columns"))
+    except ValueError as e:
+        p.error(str(e))
+    filters = dict(cfg.get("filters") or {})
+    for f in args.filter:
+        key, sep, vals = f.partition("=")
+        if not sep:
+            p.error(f"--filter expects PATH=VALUE, got {f!r}")
+        vals = vals.split("|")
+        filters[key.strip()] = vals if len(vals) > 1 else vals[0]
+    params, client_filters = split_filters(filters, cfg.get("server_filters") or [])
+    output_dir = Path(cfg["output_dir"])
+
+    # Resume: the checkpoint's month/columns/filters win so both halves of the export line up
+    prior_rows, start_page, ck = [], 1, None
+    if args.resume:
+        ck_path = Path(args.resume) if isinstance(args.resume, str) else \
+            find_checkpoint(output_dir, cfg["jobsite"], args.month)
+        if not ck_path or not ck_path.exists():
+            p.error(f"No checkpoint found ({ck_path or output_dir})")
+        ck = load_state(ck_path)
+        if ck["jobsite"] != cfg["jobsite"]:
+            p.error(f"Checkpoint is for jobsite {ck['jobsite']!r}, config says {cfg['jobsite']!r}")
+        args.month = ck["month"]
+        columns = [tuple(c) for c in ck["columns"]]
+        params, client_filters = ck["params"], ck["filters"]
+        prior_rows, start_page = ck["rows"], ck["next_page"]
+        print(f"[cli] resuming from {ck_path}: page {start_page}/{ck['last_page']}, {len(prior_rows)} rows so far")
 
-    print(f"[cli] month={args.month or 'current'} max_pages={args.max_pages} api_key_set={bool(cfg.get('api_key'))}")
+    # pin the stamp now; a deadline run may cross midnight at month end
+    args.month = args.month or started.strftime("%Y-%m")
 
     client = DmwClient(api_base=cfg["api_base"], api_key=cfg.get("api_key", ""))
-    rows = client.fetch_all(cfg["jobsite"], max_pages=args.max_pages)
-    df = to_dataframe(rows)
+    budget = None
+    if deadline:
+        budget = RunBudget(deadline, max_workers=args.max_workers or int(cfg.get("max_workers", 4)),
+                           polite_delay=client.polite_delay,
+                           max_rps=args.max_rps or float(cfg.get("max_rps", 2.0)))
+        logging.info("Deadline %s (%.0f min from now), up to %d workers, at most %.1f req/s",
+                     deadline.isoformat(timespec="minutes"), budget.remaining() / 60, budget.max_workers,
+                     1 / budget.min_interval if budget.min_interval else float("inf"))
+
+    print(f"[cli] month={args.month} max_pages={args.max_pages} api_key_set={bool(cfg.get('api_key'))} "
+          f"columns={len(columns) or 'all'} server_filters={params or '-'} client_filters={client_filters or '-'} "
+          f"deadline={deadline.isoformat(timespec='minutes') if deadline else '-'} "
+          f"shard={'/'.join(map(str, args.shard)) if args.shard else '-'}")
+
+    formats = cfg.get("formats", ["csv"])
+    meta = {}
+    def on_meta(m):
+        meta.update(m)
+        if ck:
+            check_resume_meta(ck, m)  # before any page past 1 is fetched
+    try:
+        rows = client.fetch_all(cfg["jobsite"], max_pages=args.max_pages,
+                                params=params, select=build_selector(columns, client_filters),
+                                budget=budget, start_page=start_page, shard=args.shard, on_meta=on_meta,
+                                # anything that records progress must not mistake a page error for the end
+                                raise_on_error=bool(args.shard or budget or start_page > 1))
+    except StaleCheckpoint as e:
+        logging.error("Checkpoint %s no longer matches the API (%s); resuming would skip or repeat rows. "
+                      "Checkpoint kept; rerun without --resume to start over.", ck_path, e)
+        return 1
+    except FetchIncomplete as e:
+        if args.shard:
+            write_shard(args, cfg, meta, columns, params, client_filters, e.rows, stopped=e)
+            return EXIT_PARTIAL
+        rows = prior_rows + e.rows
+        ck_path = save_state(checkpoint_path(output_dir, cfg["jobsite"], args.month), {
+            "jobsite": cfg["jobsite"], "month": args.month,
+            "columns": columns, "params": params, "filters": client_filters,
+            "next_page": e.next_page, "last_page": e.last_page, "total": e.total,
+            "meta_last_page": int(meta.get("lastPage") or e.last_page), "per_page": int(meta.get("perPage") or 0),
+            "rows": rows,
+        })
+        df = to_dataframe(rows, columns)
+        written = save(df, output_dir, cfg["jobsite"], args.month, formats, partial=True) if not df.empty else []
+        logging.warning("Run incomplete: %s, %d rows so far. Partial outputs: %s. Checkpoint: %s (rerun with --resume)",
+                        e, len(rows), ", ".join(str(w) for w in written) or "none", ck_path)
+        return EXIT_PARTIAL
+
+    if args.shard:
+        write_shard(args, cfg, meta, columns, params, client_filters, rows)
+        return 0
+
+    rows = prior_rows + rows
+    df = to_dataframe(rows, columns)
     if not df.empty:
-        save(df, Path(cfg["output_dir"]), cfg["jobsite"], args.month, cfg.get("formats", ["csv"]))
+        save(df, output_dir, cfg["jobsite"], args.month, formats, xlsx_mode=cfg.get("xlsx_mode", "file"))
+    clear_partial(output_dir, cfg["jobsite"], args.month)
     return 0
 
 if __name__ == "__main__":
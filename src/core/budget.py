@@ -0,0 +1,97 @@
+from __future__ import annotations
+import re
+import time
+import datetime as dt
+from typing import Optional
+
+class FetchIncomplete(Exception):
+    """DmwClient.fetch_all stopped before last_page. Carries the rows of pages before next_page."""
+    def __init__(self, rows: list, next_page: int, last_page: int, total: int, reason: str = "stopped"):
+        super().__init__(f"{reason} before page {next_page}/{last_page}")
+        self.rows = rows
+        self.next_page = next_page
+        self.last_page = last_page
+        self.total = total
+
+class DeadlineExceeded(FetchIncomplete):
+    """Raised by DmwClient.fetch_all when the next pages cannot finish in time."""
+    def __init__(self, rows: list, next_page: int, last_page: int, total: int):
+        super().__init__(rows, next_page, last_page, total, "deadline reached")
+
+class PageFailed(FetchIncomplete):
+    """Raised by DmwClient.fetch_all(raise_on_error=True) when a page request fails."""
+    def __init__(self, rows: list, next_page: int, last_page: int, total: int, error: Exception):
+        super().__init__(rows, next_page, last_page, total, f"page error ({error})")
+        self.error = error
+
+def parse_duration(value: str) -> float:
+    # "90" (minutes), "90m", "2h", "1h30m", "45s" → seconds
+    v = value.strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", v):
+        seconds = float(v) * 60
+    else:
+        parts = re.findall(r"(\d+(?:\.\d+)?)([hms])", v)
+        if not parts or "".join(n + u for n, u in parts) != v:
+            raise ValueError(f"Invalid duration: {value!r} (use e.g. 90m, 2h, 1h30m)")
+        seconds = sum(float(n) * {"h": 3600, "m": 60, "s": 1}[u] for n, u in parts)
+    if seconds <= 0:
+        raise ValueError(f"Time budget must be positive, got {value!r}")
+    return seconds
+
+def parse_deadline(value: str, now: Optional[dt.datetime] = None) -> dt.datetime:
+    # "HH:MM" → next occurrence in local time (a 23:55 run with "02:00" means tomorrow), or ISO datetime.
+    # Always returns naive local time (an ISO value with a UTC offset is converted) strictly after now.
+    now = now or dt.datetime.now()
+    v = value.strip()
+    try:
+        t = dt.datetime.strptime(v, "%H:%M").time()
+    except ValueError:
+        try:
+            d = dt.datetime.fromisoformat(v)
+        except ValueError:
+            raise ValueError(f"Invalid deadline: {value!r} (use HH:MM or YYYY-MM-DDTHH:MM)") from None
+        if d.tzinfo is not None:
+            d = d.astimezone().replace(tzinfo=None)
+        if d <= now:
+            raise ValueError(f"Deadline {value!r} is not in the future")
+        return d
+    d = dt.datetime.combine(now.date(), t)
+    return d if d > now else d + dt.timedelta(days=1)
+
+class RunBudget:
+    """
+    Wall-clock budget for one run. Learns per-page latency as pages come in and picks
+    the smallest concurrency (up to max_workers) that should still finish in time.
+    Each worker still pauses polite_delay after every response; max_rps caps request
+    starts across all workers (min_interval = 1 / max_rps), whatever the concurrency.
+    """
+    def __init__(self, deadline: dt.datetime, max_workers: int = 4, polite_delay: float = 0.3,
+                 max_rps: float = 2.0, safety: float = 1.2):
+        self.deadline_ts = deadline.timestamp()
+        self.max_workers = max(1, max_workers)
+        self.polite_delay = polite_delay
+        self.min_interval = 1.0 / max_rps if max_rps > 0 else 0.0
+        self.safety = safety
+        self.latency: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        # EMA so a slow patch shows up quickly but one outlier doesn't dominate
+        self.latency = seconds if self.latency is None else 0.7 * self.latency + 0.3 * seconds
+
+    def remaining(self) -> float:
+        return self.deadline_ts - time.time()
+
+    def eta(self, pages_left: int, workers: int) -> float:
+        # Parallel workers overlap latency + pause, but starts are still spaced by min_interval
+        per_page = ((self.latency or 0.0) + self.polite_delay) / workers
+        return pages_left * max(per_page, self.min_interval)
+
+    def workers_for(self, pages_left: int) -> int:
+        for w in range(1, self.max_workers + 1):
+            if self.eta(pages_left, w) * self.safety <= self.remaining():
+                return w
+        return self.max_workers
+
+    def can_start(self) -> bool:
+        # Only start pages that should come back before the deadline
+        return self.remaining() > (self.latency or 0.0) * self.safety
@@ -11,6 +11,21 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "output_dir": "./output",
     "formats": ["csv"],
     "timezone": "Europe/Prague",
+    # Output projection: dotted source paths, optionally "path=Alias" (or a {path: alias} dict).
+    # Empty → every flattened field, as before.
+    "columns": [],
+    # Row filters: {dotted path: value or [values]}. Keys listed in server_filters are sent
+    # to the API as query params; the rest are applied per page before flattening.
+    "filters": {},
+    "server_filters": [],
+    # Upper bound on concurrent page fetches when a run has a deadline (cli --deadline/--time-budget)
+    "max_workers": 4,
+    # ...and a request-rate cap across those workers; runs without a deadline stay sequential
+    "max_rps": 2.0,
+    # setup_logging options: json_lines, max_bytes, rotate_when, backup_count, keep_files, keep_days
+    "logging": {"json_lines": False, "keep_files": 50, "keep_days": 90},
+    # "file": new .xlsx per month; "append": one workbook per jobsite, sheet per month (+ Index)
+    "xlsx_mode": "file",
 }
 
 def _exe_dir() -> Path:
@@ -64,8 +79,14 @@ def load_config(_) -> Dict[str, Any]:
 def save_config(_, cfg: Dict[str, Any]) -> None:
     external, _ = find_config_paths()
     external.parent.mkdir(parents=True, exist_ok=True)
+    # Keep keys the GUI doesn't edit (columns, filters, …) instead of dropping them
+    merged: Dict[str, Any] = {}
+    if external.exists():
+        with external.open("r", encoding="utf-8") as f:
+            merged.update(json.load(f))
+    merged.update(cfg)
     with external.open("w", encoding="utf-8") as f:
-        json.dump(cfg, f, ensure_ascii=False, indent=2)
+        json.dump(merged, f, ensure_ascii=False, indent=2)
 
 def normalize_formats(vals: List[str]) -> List[str]:
     uniq: List[str] = []
@@ -74,3 +95,40 @@ def normalize_formats(vals: List[str]) -> List[str]:
         if v in ("csv", "xlsx") and v not in uniq:
             uniq.append(v)
     return uniq or ["csv"]
+
+def normalize_columns(vals: Any) -> List[Tuple[str, str]]:
+    """
+    Returns [(source_path, output_name), ...] in output order.
+    Accepts a {path: alias} dict, or a list of "path" / "path=alias" strings.
+    Raises ValueError if two different paths would land in the same output column.
+    """
+    if not vals:
+        return []
+    items = vals.items() if isinstance(vals, dict) else (
+        (v.split("=", 1) + [""])[:2] if isinstance(v, str) else v for v in vals
+    )
+    cols: List[Tuple[str, str]] = []
+    seen: Dict[str, str] = {}
+    for path, alias in items:
+        path = str(path).strip()
+        alias = str(alias or "").strip() or path
+        if not path:
+            continue
+        if alias in seen:
+            if seen[alias] != path:
+                raise ValueError(f"columns: alias {alias!r} used for both {seen[alias]!r} and {path!r}")
+            continue  # same entry listed twice
+        seen[alias] = path
+        cols.append((path, alias))
+    return cols
+
+def split_filters(filters: Dict[str, Any], server_keys: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Returns (query_params, client_filters). Only scalar values can go to the server."""
+    params: Dict[str, Any] = {}
+    client: Dict[str, Any] = {}
+    for key, val in (filters or {}).items():
+        if key in (server_keys or []) and not isinstance(val, (list, tuple)):
+            params[key] = val
+        else:
+            client[key] = val
+    return params, client
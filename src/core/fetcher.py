@@ -1,7 +1,11 @@
 from __future__ import annotations
 import time
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.budget import DeadlineExceeded, PageFailed, RunBudget
 
 # Prefer curl_cffi (Chrome-like TLS/HTTP2). Fall back to requests if not present.
 try:
@@ -14,6 +18,12 @@ except Exception:  # pragma: no cover
     _HAS_CFFI = False
 
 
+def shard_range(last_page: int, index: int, count: int) -> Tuple[int, int]:
+    """Contiguous pages (first, last) for 1-based shard index of count; empty slice → first > last."""
+    size, extra = divmod(last_page, count)
+    first = (index - 1) * size + min(index - 1, extra) + 1
+    return first, first + size + (1 if index <= extra else 0) - 1
+
 class DmwClient:
     def __init__(
         self,
@@ -29,59 +39,167 @@ class DmwClient:
         self.api_base = api_base.rstrip("/")
         self.timeout = timeout
         self.polite_delay = polite_delay
+        self._user_agent = user_agent
+        self._api_key = api_key
+        self.session = self._new_session()
+
+        # Concurrent fetches (budget runs only): one session per worker thread, starts spaced by a rate gate
+        self._local = threading.local()
+        self._gate = threading.Lock()
+        self._next_start = 0.0
 
-        self.session = http.Session()
+    def _new_session(self):
+        session = http.Session()
         # curl_cffi sessions can impersonate a browser; set once.
         if _HAS_CFFI and _IMPERS:
-            self.session.impersonate = _IMPERS  # type: ignore[attr-defined]
+            session.impersonate = _IMPERS  # type: ignore[attr-defined]
 
         # Browser-like default headers
-        self.session.headers.update({
-            "user-agent": user_agent,
+        session.headers.update({
+            "user-agent": self._user_agent,
             "accept": "application/json",
             "origin": "https://dmw.gov.ph",
             "referer": "https://dmw.gov.ph/",
             "accept-language": "en-US,en;q=0.9",
         })
-        if api_key:
+        if self._api_key:
             # match the working fetch: lower-case header name
-            self.session.headers.update({"x-api-key": api_key})
+            session.headers.update({"x-api-key": self._api_key})
+        return session
 
-    def fetch_page(self, jobsite: str, page: int) -> Dict[str, Any]:
-        params = {"jobsite": jobsite, "page": page}
+    def _session(self):
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        if getattr(self._local, "session", None) is None:
+            self._local.session = self._new_session()
+        return self._local.session
+
+    def fetch_page(self, jobsite: str, page: int, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # extra params are server-side filters; jobsite/page always win
+        params = {**(params or {}), "jobsite": jobsite, "page": page}
         if _HAS_CFFI and _IMPERS:
-            r = self.session.get(self.api_base, params=params, timeout=self.timeout)
+            r = self._session().get(self.api_base, params=params, timeout=self.timeout)
         else:
             # fallback (may get 401 on bot-protected edges)
-            r = self.session.get(self.api_base, params=params, timeout=self.timeout)
+            r = self._session().get(self.api_base, params=params, timeout=self.timeout)
         r.raise_for_status()
         return r.json()
 
-    def fetch_all(self, jobsite: str, max_pages: Optional[int] = None, progress=None) -> List[Dict[str, Any]]:
-        data0 = self.fetch_page(jobsite, 1)
+    def _fetch_timed(self, jobsite: str, page: int, params: Optional[Dict[str, Any]],
+                     min_interval: float = 0.0, pause: float = 0.0,
+                     ) -> Tuple[int, Optional[Dict[str, Any]], Optional[Exception], float]:
+        """
+        min_interval: spacing between request starts across all workers (budget rate cap).
+        pause: polite sleep after a successful response, per worker (not counted in latency).
+        """
+        if min_interval > 0:
+            with self._gate:
+                wait = self._next_start - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._next_start = time.monotonic() + min_interval
+        t0 = time.monotonic()
+        try:
+            data = self.fetch_page(jobsite, page, params)
+        except Exception as e:
+            return page, None, e, time.monotonic() - t0
+        took = time.monotonic() - t0
+        if pause > 0:
+            time.sleep(pause)
+        return page, data, None, took
+
+    def fetch_all(self, jobsite: str, max_pages: Optional[int] = None, progress=None,
+                  params: Optional[Dict[str, Any]] = None,
+                  select: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+                  budget: Optional[RunBudget] = None, start_page: int = 1,
+                  shard: Optional[Tuple[int, int]] = None,
+                  on_meta: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  raise_on_error: bool = False,
+                  ) -> List[Dict[str, Any]]:
+        """
+        params: extra query params (server-side filters).
+        select: applied to each page's rows as it arrives (see transform.build_selector),
+                so dropped rows/fields are never accumulated.
+        budget: fetch pages concurrently as needed to meet the deadline; raises DeadlineExceeded
+                (with the rows so far) instead of starting pages that cannot finish in time.
+        start_page: resume from a checkpoint; page 1 is still fetched for meta but its rows are skipped.
+        shard: (index, count) — only fetch that slice of 1..lastPage (see shard_range); page 1's meta is the plan.
+        on_meta: called with page 1's meta before any other page is fetched.
+        raise_on_error: a failed page raises PageFailed (with the rows so far) instead of
+                        logging and returning a short result. Callers that record progress
+                        (checkpoints, shard files) need this to tell "done" from "stopped".
+        """
+        _, data0, err, took = self._fetch_timed(jobsite, 1, params)
+        if err:
+            raise err
+        if budget:
+            budget.observe(took)
         meta = data0.get("meta", {})
         last_page = int(meta.get("lastPage") or 1)
         total = int(meta.get("total") or 0)
         per_page = int(meta.get("perPage") or 0)
-        rows = data0.get("data") or []
         if progress:
             progress(f"Meta: total={total}, perPage={per_page}, lastPage={last_page}")
+        if on_meta:
+            on_meta(meta)
 
-        all_rows: List[Dict[str, Any]] = list(rows)
         if max_pages is not None:
             last_page = min(last_page, max_pages)
-
-        for page in range(2, last_page + 1):
+        first_page = 1
+        if shard:
+            first_page, last_page = shard_range(last_page, *shard)
             if progress:
-                progress(f"Fetching page {page}/{last_page} …")
-            try:
-                data = self.fetch_page(jobsite, page)
-                all_rows.extend(data.get("data") or [])
-            except Exception as e:
-                logging.error("Error on page %d: %s", page, e)
-                break
-            time.sleep(self.polite_delay)
+                progress(f"Shard {shard[0]}/{shard[1]}: pages {first_page}–{last_page}")
+
+        rows = (data0.get("data") or []) if first_page == 1 and start_page <= 1 else []
+        if select:
+            rows = select(rows)
+        all_rows: List[Dict[str, Any]] = list(rows)
+
+        pages = list(range(max(2, first_page, start_page), last_page + 1))
+        if budget and pages:
+            eta = budget.eta(len(pages), budget.max_workers)
+            if eta * budget.safety > budget.remaining():
+                logging.warning("Budget: %d pages need ~%.0fs at %d workers, only %.0fs left; expect partial output",
+                                len(pages), eta, budget.max_workers, budget.remaining())
+
+        pool = ThreadPoolExecutor(budget.max_workers) if budget and budget.max_workers > 1 else None
+        try:
+            i = 0
+            while i < len(pages):
+                if budget and not budget.can_start():
+                    raise DeadlineExceeded(all_rows, pages[i], last_page, total)
+                workers = budget.workers_for(len(pages) - i) if budget else 1
+                batch = pages[i:i + workers]
+                if progress:
+                    shown = f"{batch[0]}" if len(batch) == 1 else f"{batch[0]}–{batch[-1]}"
+                    progress(f"Fetching page {shown}/{last_page} …")
+                # No budget: sequential with polite_delay after each page, exactly as before
+                gate = budget.min_interval if budget else 0.0
+                fetch = lambda pg: self._fetch_timed(jobsite, pg, params, gate, self.polite_delay)
+                results = list(pool.map(fetch, batch)) if pool and len(batch) > 1 else [fetch(pg) for pg in batch]
+
+                # keep pages contiguous: stop at the first failure, like the sequential loop did
+                failed = False
+                for page, data, err, took in results:
+                    if err:
+                        logging.error("Error on page %d: %s", page, err)
+                        if raise_on_error:
+                            raise PageFailed(all_rows, page, last_page, total, err)
+                        failed = True
+                        break
+                    if budget:
+                        budget.observe(took)
+                    page_rows = data.get("data") or []
+                    all_rows.extend(select(page_rows) if select else page_rows)
+                    i += 1
+                if failed:
+                    break
+        finally:
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
 
         if progress:
-            progress(f"Collected {len(all_rows)} rows (API total said {total}).")
+            progress(f"Collected {len(all_rows)} rows (API total said {total}"
+                     f"{', before client-side filters' if select else ''}).")
         return all_rows
@@ -1,17 +1,139 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 
-def setup_logging(base_dir: Path) -> Path:
+_listener: Optional[logging.handlers.QueueListener] = None
+# setup_logging keywords that config.json's "logging" section may set
+_CONFIG_OPTIONS = ("json_lines", "max_bytes", "rotate_when", "backup_count", "keep_files", "keep_days")
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener:
+        _listener.stop()  # drains the queue
+        _listener = None
+
+class _RunContext(logging.Filter):
+    # Stamps run_id/jobsite on every record at creation time (caller's thread)
+    def __init__(self, run_id: str, jobsite: str):
+        super().__init__()
+        self.run_id = run_id
+        self.jobsite = jobsite
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = self.run_id
+        record.jobsite = self.jobsite
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # Stock prepare() folds the traceback into msg and clears exc_info/exc_text. Keep it in
+    # exc_text instead: JSON lines get a separate "exc" field, and the text formatter appends
+    # exc_text as usual. exc_info (live frames) still never crosses the queue.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        rec = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", None),
+            "jobsite": getattr(record, "jobsite", None),
+            "msg": record.getMessage(),
+        }
+        if record.exc_text or record.exc_info:
+            rec["exc"] = record.exc_text or self.formatException(record.exc_info)
+        if record.stack_info:
+            rec["stack"] = record.stack_info
+        return json.dumps(rec, ensure_ascii=False)
+
+def prune_logs(logs_dir: Path, keep_files: int | None = None, keep_days: float | None = None) -> int:
+    """Retention for logs/: newest keep_files run logs (rotated pieces count too), none older than keep_days."""
+    files = sorted((p for p in logs_dir.glob("run_*") if p.is_file()),
+                   key=lambda p: p.stat().st_mtime, reverse=True)
+    cutoff = time.time() - keep_days * 86400 if keep_days else None
+    removed = 0
+    for i, p in enumerate(files):
+        if (keep_files and i >= keep_files) or (cutoff and p.stat().st_mtime < cutoff):
+            try:
+                p.unlink()
+                removed += 1
+            except OSError:
+                pass  # still open elsewhere (Windows) — next run gets it
+    return removed
+
+def setup_logging(base_dir: Path, jobsite: str = "", json_lines: bool = False,
+                  max_bytes: int = 0, rotate_when: str | None = None, backup_count: int = 5,
+                  keep_files: int | None = 50, keep_days: float | None = None) -> Path:
+    """
+    Root logger → QueueHandler; a QueueListener thread does the file/console I/O,
+    so logging from the fetch loop never waits on disk.
+    max_bytes / rotate_when ("midnight", "H", …) rotate the run log; keep_files / keep_days prune logs/.
+    """
+    global _listener
     logs_dir = base_dir / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
+
     ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    log_path = logs_dir / f"run_{ts}.log"
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(message)s",
-        handlers=[logging.FileHandler(log_path, encoding="utf-8-sig"),
-                  logging.StreamHandler()]
-    )
-    logging.info("Log file: %s", log_path)
+    run_id = f"{ts}-{uuid.uuid4().hex[:6]}"
+    log_path = logs_dir / f"run_{ts}.{'jsonl' if json_lines else 'log'}"
+    encoding = "utf-8" if json_lines else "utf-8-sig"
+    if rotate_when:
+        file_handler: logging.Handler = logging.handlers.TimedRotatingFileHandler(
+            log_path, when=rotate_when, backupCount=backup_count, encoding=encoding)
+    elif max_bytes:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+    else:
+        file_handler = logging.FileHandler(log_path, encoding=encoding)
+    text_fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else text_fmt)
+    console = logging.StreamHandler()
+    console.setFormatter(text_fmt)
+
+    # Re-entrant (GUI may call again): flush and replace the previous pipeline
+    _stop_listener()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+    # After the new file exists (it counts toward keep_files) and the previous run's file is closed
+    prune_logs(logs_dir, keep_files, keep_days)
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    qh = _QueueHandler(q)
+    qh.addFilter(_RunContext(run_id, jobsite))
+    root.addHandler(qh)
+    root.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(q, file_handler, console, respect_handler_level=True)
+    _listener.start()
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
+
+    logging.info("Log file: %s (run_id=%s)", log_path, run_id)
     return log_path
+
+def setup_logging_from_config(base_dir: Path, cfg: dict) -> Path:
+    """setup_logging with cfg["logging"]; unknown keys (typos, newer configs) are warned about and ignored."""
+    section = cfg.get("logging") or {}
+    path = setup_logging(base_dir, jobsite=cfg.get("jobsite", ""),
+                         **{k: v for k, v in section.items() if k in _CONFIG_OPTIONS})
+    unknown = sorted(set(section) - set(_CONFIG_OPTIONS))
+    if unknown:
+        logging.warning("Ignoring unknown logging config keys: %s (known: %s)",
+                        ", ".join(unknown), ", ".join(_CONFIG_OPTIONS))
+    return path
@@ -1,10 +1,76 @@
 from __future__ import annotations
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import pandas as pd
 
-def to_dataframe(rows: List[Dict]) -> pd.DataFrame:
+_MISSING = object()
+
+def _lookup(row: Dict, path: str) -> Any:
+    # "a.b.c" → row["a"]["b"]["c"]; same paths json_normalize would produce
+    cur: Any = row
+    for part in path.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return _MISSING
+        cur = cur[part]
+    return cur
+
+def _matches(value: Any, wanted: Any) -> bool:
+    # Case-insensitive string compare; a list means "any of"
+    if value is _MISSING:
+        return False
+    options = wanted if isinstance(wanted, (list, tuple)) else [wanted]
+    v = str(value).casefold()
+    return any(v == str(w).casefold() for w in options)
+
+def _put(rec: Dict, key: str, val: Any) -> None:
+    # Nested objects flatten to key.sub like json_normalize (empty dict → no column)
+    if isinstance(val, dict):
+        for k, v in val.items():
+            _put(rec, f"{key}.{k}", v)
+    else:
+        rec[key] = val
+
+def build_selector(columns: Sequence[Tuple[str, str]] = (), filters: Optional[Dict[str, Any]] = None
+                   ) -> Optional[Callable[[List[Dict]], List[Dict]]]:
+    """
+    Per-page row filter + projection applied on raw API rows, before flattening.
+    With columns, rows come back as flat {alias: value} dicts holding only those fields;
+    a path to an object yields alias.<subkey> entries, as json_normalize would.
+    Returns None when there is nothing to do.
+    """
+    filters = filters or {}
+    if not columns and not filters:
+        return None
+
+    def select(rows: List[Dict]) -> List[Dict]:
+        if filters:
+            rows = [r for r in rows if all(_matches(_lookup(r, k), v) for k, v in filters.items())]
+        if columns:
+            out = []
+            for r in rows:
+                rec = {}
+                for path, alias in columns:
+                    val = _lookup(r, path)
+                    _put(rec, alias, None if val is _MISSING else val)
+                out.append(rec)
+            rows = out
+        return rows
+    return select
+
+def to_dataframe(rows: List[Dict], columns: Sequence[Tuple[str, str]] = ()) -> pd.DataFrame:
     if not rows:
         return pd.DataFrame()
+    if columns:
+        # Rows are already projected by build_selector; keep the configured order,
+        # with any expanded object columns (alias.sub…) sorted right after their alias
+        keys = set().union(*rows)
+        aliases = {alias for _, alias in columns}
+        order: List[str] = []
+        for _, alias in columns:
+            subs = sorted(k for k in keys if k.startswith(alias + ".") and k not in aliases)
+            if alias in keys or not subs:
+                order.append(alias)
+            order.extend(k for k in subs if k not in order)
+        return pd.DataFrame.from_records(rows, columns=order)
     df = pd.json_normalize(rows, sep=".")
     # Sort columns for stable output
     return df.reindex(sorted(df.columns), axis=1)
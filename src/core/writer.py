@@ -1,30 +1,89 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List
 import csv
+import json
 import pandas as pd
 import datetime as dt
 
+from core.xlsxbook import update_month_sheet
+
 def month_stamp_for_filename(value: str | None) -> dt.date:
     # value: 'YYYY-MM' or None → current month
     if value:
         return dt.datetime.strptime(value, "%Y-%m").date().replace(day=1)
     return dt.date.today().replace(day=1)
 
-def save(df: pd.DataFrame, output_dir: Path, jobsite: str, month_yyyy_mm: str | None, formats: List[str]) -> List[Path]:
-    output_dir.mkdir(parents=True, exist_ok=True)
+def output_base(output_dir: Path, jobsite: str, month_yyyy_mm: str | None) -> Path:
     stamp_date = month_stamp_for_filename(month_yyyy_mm)
     stamp = stamp_date.strftime("%Y-%m")
     safe_jobsite = jobsite.replace(" ", "-")
-    base = output_dir / f"approved-job-orders_{safe_jobsite}_{stamp}"
+    return output_dir / f"approved-job-orders_{safe_jobsite}_{stamp}"
+
+def workbook_path(output_dir: Path, jobsite: str) -> Path:
+    # xlsx_mode="append": one workbook per jobsite, one sheet per month
+    safe_jobsite = jobsite.replace(" ", "-")
+    return output_dir / f"approved-job-orders_{safe_jobsite}.xlsx"
+
+def save(df: pd.DataFrame, output_dir: Path, jobsite: str, month_yyyy_mm: str | None, formats: List[str],
+         partial: bool = False, xlsx_mode: str = "file") -> List[Path]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    base = output_base(output_dir, jobsite, month_yyyy_mm)
+    if partial:
+        # Incomplete run (deadline hit): never let it pass for the real export
+        base = base.with_name(base.name + "_PARTIAL")
 
     written: List[Path] = []
     if "csv" in formats:
         p = base.with_suffix(".csv")
         df.to_csv(p, index=False, encoding="utf-8-sig", quoting=csv.QUOTE_MINIMAL)
         written.append(p)
-    if "xlsx" in formats:
+    if "xlsx" in formats and xlsx_mode == "append" and not partial:
+        # Only this month's sheet (and the index) is rewritten; other sheets are copied as-is
+        stamp = month_stamp_for_filename(month_yyyy_mm).strftime("%Y-%m")
+        written.append(update_month_sheet(workbook_path(output_dir, jobsite), stamp, df))
+    elif "xlsx" in formats:
         p = base.with_suffix(".xlsx")
         df.to_excel(p, index=False)
         written.append(p)
     return written
+
+def checkpoint_path(output_dir: Path, jobsite: str, month_yyyy_mm: str | None) -> Path:
+    base = output_base(output_dir, jobsite, month_yyyy_mm)
+    return base.with_name(base.name + ".checkpoint.json")
+
+def find_checkpoint(output_dir: Path, jobsite: str, month_yyyy_mm: str | None) -> Path | None:
+    # Given month, or else the newest one for the jobsite (a resume may land in the next month)
+    if month_yyyy_mm:
+        return checkpoint_path(output_dir, jobsite, month_yyyy_mm)
+    safe_jobsite = jobsite.replace(" ", "-")
+    found = sorted(output_dir.glob(f"approved-job-orders_{safe_jobsite}_*.checkpoint.json"))
+    return found[-1] if found else None
+
+def save_state(path: Path, state: Dict[str, Any]) -> Path:
+    # Checkpoints and shard artifacts: run settings + rows (already filtered/projected), written atomically
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, default=str)
+    tmp.replace(path)
+    return path
+
+def load_state(path: Path) -> Dict[str, Any]:
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def shard_path(output_dir: Path, jobsite: str, month_yyyy_mm: str | None, index: int, count: int) -> Path:
+    base = output_base(output_dir, jobsite, month_yyyy_mm)
+    return base.with_name(f"{base.name}.shard-{index}-of-{count}.json")
+
+def find_shards(shard_dir: Path, jobsite: str, month_yyyy_mm: str | None) -> List[Path]:
+    base = output_base(shard_dir, jobsite, month_yyyy_mm)
+    return sorted(shard_dir.glob(f"{base.name}.shard-*-of-*.json"))
+
+def clear_partial(output_dir: Path, jobsite: str, month_yyyy_mm: str | None) -> None:
+    # After a complete run: drop the checkpoint and any _PARTIAL outputs for the same month
+    base = output_base(output_dir, jobsite, month_yyyy_mm)
+    checkpoint_path(output_dir, jobsite, month_yyyy_mm).unlink(missing_ok=True)
+    for p in output_dir.glob(base.name + "_PARTIAL.*"):
+        p.unlink(missing_ok=True)
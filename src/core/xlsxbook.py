@@ -0,0 +1,313 @@
+"""
+Incremental .xlsx updates: one workbook per jobsite, one sheet per month.
+
+The workbook is a zip package. Updating a month rewrites the zip, but every part we don't
+touch is copied as its compressed bytes (no decompress, no XML parse), the new month sheet is
+streamed straight into the archive, and only the small package XML files (workbook.xml, its
+rels, [Content_Types].xml) are edited. Cost therefore tracks the new month, not the workbook.
+"""
+from __future__ import annotations
+import copy
+import math
+import numbers
+import os
+import posixpath
+import re
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+INDEX_SHEET = "Index"
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_REL_SHEET = _NS_R + "/worksheet"
+_REL_CALC = _NS_R + "/calcChain"
+_CT_SHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Minimal package for a brand-new workbook; sheets are added by the normal update path
+_SKELETON = {
+    "[Content_Types].xml": _XML_DECL +
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>',
+    "_rels/.rels": _XML_DECL +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_NS_R}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>',
+    "xl/workbook.xml": _XML_DECL +
+        f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_R}"><sheets></sheets></workbook>',
+    "xl/_rels/workbook.xml.rels": _XML_DECL +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_NS_R}/styles" Target="styles.xml"/>'
+        '</Relationships>',
+    "xl/styles.xml": _XML_DECL +
+        f'<styleSheet xmlns="{_NS_MAIN}">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>',
+}
+
+_SHEET_RE = re.compile(r"<(?:\w+:)?sheet\b[^>]*?/>")
+_REL_RE = re.compile(r"<(?:\w+:)?Relationship\b[^>]*?/>")
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _attr(tag: str, name: str) -> Optional[str]:
+    # name="id" matches r:id / x:id but not sheetId
+    m = re.search(r'\s(?:\w+:)?%s="([^"]*)"' % re.escape(name), tag)
+    return m.group(1) if m else None
+
+def _unescape(s: str) -> str:
+    return (s.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+             .replace("&apos;", "'").replace("&amp;", "&"))
+
+def _col_letter(n: int) -> str:
+    # 1 → A, 27 → AA
+    s = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+def _col_number(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+def _cell(ref: str, v) -> str:
+    if v is None or v is pd.NA or v is pd.NaT:
+        return ""
+    if isinstance(v, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(v)}</v></c>'
+    if isinstance(v, numbers.Real):
+        f = float(v)
+        if math.isnan(f):
+            return ""
+        if math.isfinite(f):
+            return f'<c r="{ref}"><v>{repr(f) if isinstance(v, float) else v}</v></c>'
+    text = _ILLEGAL_XML.sub("", str(v))[:32767]  # Excel's per-cell limit
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+def _write_sheet(zout: zipfile.ZipFile, part: str, header: List[str], rows: Iterable[Tuple], n_rows: int) -> None:
+    # Inline strings + default style: the sheet depends on no shared part, so nothing else is rewritten
+    cols = [_col_letter(i + 1) for i in range(len(header))]
+    dim = f"A1:{cols[-1]}{n_rows + 1}" if cols else "A1"
+    with zout.open(part, "w") as f:
+        f.write((_XML_DECL + f'<worksheet xmlns="{_NS_MAIN}"><dimension ref="{dim}"/><sheetData>').encode("utf-8"))
+        f.write(f'<row r="1">{"".join(_cell(f"{c}1", v) for c, v in zip(cols, header))}</row>'.encode("utf-8"))
+        for r, values in enumerate(rows, start=2):
+            f.write(f'<row r="{r}">{"".join(_cell(f"{c}{r}", v) for c, v in zip(cols, values))}</row>'.encode("utf-8"))
+        f.write(b"</sheetData></worksheet>")
+
+# _copy_raw is the only code touching zipfile internals (fp, filelist, NameToInfo, start_dir,
+# _didModify, ZipInfo.FileHeader), so all of it lives here. _raw_copy_supported checks those
+# are still there. If a Python upgrade removes them, _copy_member falls back to a public-API
+# decompress/recompress copy: slower, but still no XML parse. tests/test_xlsxbook.py covers both paths.
+_ZOUT_INTERNALS = ("fp", "filelist", "NameToInfo", "start_dir", "_didModify", "_writing")
+
+def _raw_copy_supported(zin: zipfile.ZipFile, zout: zipfile.ZipFile) -> bool:
+    return (all(hasattr(zout, a) for a in _ZOUT_INTERNALS) and hasattr(zin, "fp")
+            and callable(getattr(zipfile.ZipInfo, "FileHeader", None)))
+
+def _copy_member(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo, raw: bool) -> None:
+    if raw:
+        _copy_raw(zin, zout, info)
+        return
+    out = zipfile.ZipInfo(info.filename, info.date_time)
+    out.compress_type, out.external_attr = info.compress_type, info.external_attr
+    with zin.open(info) as src, zout.open(out, "w") as dst:
+        while chunk := src.read(1 << 20):
+            dst.write(chunk)
+
+def _copy_raw(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """Copy one member's compressed bytes unchanged (zipfile has no public API for this)."""
+    if zout._writing:
+        raise ValueError("raw copy while another member is open for writing")
+    zin.fp.seek(info.header_offset)
+    fheader = zin.fp.read(30)
+    name_len, extra_len = struct.unpack("<HH", fheader[26:30])
+    zin.fp.seek(info.header_offset + 30 + name_len + extra_len)
+
+    out = copy.copy(info)
+    out.flag_bits &= ~0x08  # sizes/CRC go in the local header; don't expect a data descriptor
+    out.header_offset = zout.fp.tell()
+    zout.fp.write(out.FileHeader())
+    left = info.compress_size
+    while left:
+        chunk = zin.fp.read(min(left, 1 << 20))
+        if not chunk:
+            raise zipfile.BadZipFile(f"truncated member {info.filename}")
+        zout.fp.write(chunk)
+        left -= len(chunk)
+    zout.filelist.append(out)
+    zout.NameToInfo[out.filename] = out
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+def _rels_part(part: str) -> str:
+    # xl/worksheets/sheet1.xml → xl/worksheets/_rels/sheet1.xml.rels ("" → the package's _rels/.rels)
+    folder, fname = posixpath.split(part)
+    return posixpath.join(folder, "_rels", fname + ".rels")
+
+def _rel_targets(rels_xml: str, source: str) -> List[str]:
+    # Internal targets of a .rels file, as part names (relative targets resolve against the source's folder)
+    out = []
+    for tag in _REL_RE.findall(rels_xml):
+        if _attr(tag, "TargetMode") == "External":
+            continue
+        target = _unescape(_attr(tag, "Target") or "")
+        out.append(target.lstrip("/") if target.startswith("/")
+                   else posixpath.normpath(posixpath.join(posixpath.dirname(source), target)))
+    return out
+
+def _orphaned_parts(zin: zipfile.ZipFile, names: set, wb_rels_xml: str, replaced: set) -> set:
+    """
+    Parts that only the replaced sheets led to (tables, comments, drawings and their charts/images),
+    given the workbook rels as they will be written. Only .rels files are read, never sheet XML.
+    """
+    def reach(starts: Iterable[str], skip: set) -> set:
+        seen, todo = set(), list(starts)
+        while todo:
+            part = todo.pop()
+            if part in seen:
+                continue
+            seen.add(part)
+            rp = _rels_part(part)
+            if part == "xl/workbook.xml":
+                todo.extend(_rel_targets(wb_rels_xml, part))
+            elif part not in skip and rp in names:
+                todo.extend(_rel_targets(zin.read(rp).decode("utf-8"), part))
+        return seen
+
+    # everything the old sheets pointed at, minus what the package still reaches without them
+    candidates = reach(replaced, set()) - replaced
+    return candidates - reach([""], replaced)
+
+def _sheet_size(zin: zipfile.ZipFile, part: str) -> Tuple[int, int]:
+    # (data rows, columns) from <dimension>, reading only the head of the part
+    with zin.open(part) as f:
+        head = f.read(4096).decode("utf-8", "ignore")
+    m = re.search(r'<(?:\w+:)?dimension\s+ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"', head)
+    if not m:
+        return 0, 0
+    last_col, last_row = (m.group(3), m.group(4)) if m.group(3) else (m.group(1), m.group(2))
+    return max(int(last_row) - 1, 0), _col_number(last_col)
+
+def update_month_sheet(path: Path, sheet_name: str, df: pd.DataFrame, index_sheet: str = INDEX_SHEET) -> Path:
+    """
+    Add or replace `sheet_name` in the workbook at `path` (created if missing) and refresh the
+    index sheet (one row per data sheet: name, rows, columns). Other sheets are left byte-identical.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    src = path
+    if not path.exists():
+        with zipfile.ZipFile(tmp.with_suffix(".new"), "w", zipfile.ZIP_DEFLATED) as z:
+            for name, text in _SKELETON.items():
+                z.writestr(name, text)
+        src = tmp.with_suffix(".new")
+
+    try:
+        with zipfile.ZipFile(src) as zin, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout:
+            wb_xml = zin.read("xl/workbook.xml").decode("utf-8")
+            rels_xml = zin.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+            ct_xml = zin.read("[Content_Types].xml").decode("utf-8")
+            names = set(zin.namelist())
+
+            rels: Dict[str, Tuple[str, str]] = {}  # rId → (type, part name)
+            for tag in _REL_RE.findall(rels_xml):
+                target = _attr(tag, "Target") or ""
+                part = target.lstrip("/") if target.startswith("/") else posixpath.normpath("xl/" + target)
+                rels[_attr(tag, "Id") or ""] = (_attr(tag, "Type") or "", part)
+            sheets = [(_unescape(_attr(t, "name") or ""), _attr(t, "id") or "") for t in _SHEET_RE.findall(wb_xml)]
+            sheet_ids = [int(_attr(t, "sheetId") or 0) for t in _SHEET_RE.findall(wb_xml)]
+
+            def ensure_sheet(name: str) -> str:
+                # existing part for `name`, or register a new one (appended, so sheet positions don't shift)
+                nonlocal wb_xml, rels_xml, ct_xml
+                for n, rid in sheets:
+                    if n == name and rid in rels:
+                        return rels[rid][1]
+                k = 1
+                while f"xl/worksheets/sheet{k}.xml" in names:
+                    k += 1
+                part = f"xl/worksheets/sheet{k}.xml"
+                names.add(part)
+                k = 1
+                while f"rId{k}" in rels:
+                    k += 1
+                rid = f"rId{k}"
+                rels[rid] = (_REL_SHEET, part)
+                sheet_id = max(sheet_ids, default=0) + 1
+                sheet_ids.append(sheet_id)
+                sheets.append((name, rid))
+                wb_xml = re.sub(r"<sheets\s*/>", "<sheets></sheets>", wb_xml, count=1).replace("</sheets>",
+                    f'<sheet xmlns:r="{_NS_R}" name={quoteattr(name)} sheetId="{sheet_id}" r:id="{rid}"/></sheets>', 1)
+                rels_xml = rels_xml.replace("</Relationships>",
+                    f'<Relationship Id="{rid}" Type="{_REL_SHEET}" Target="/{part}"/></Relationships>')
+                ct_xml = ct_xml.replace("</Types>", f'<Override PartName="/{part}" ContentType="{_CT_SHEET}"/></Types>')
+                return part
+
+            if not sheets:
+                ensure_sheet(index_sheet)  # new workbook: index goes first
+            month_part = ensure_sheet(sheet_name)
+            index_part = ensure_sheet(index_sheet)
+
+            # Excel rebuilds calcChain; a stale one pointing into a replaced sheet makes it "repair" the file
+            calc_parts = {part for typ, part in rels.values() if typ == _REL_CALC}
+            for rid in [r for r, (typ, _) in rels.items() if typ == _REL_CALC]:
+                rels_xml = re.sub(r'<(?:\w+:)?Relationship\b[^>]*Id="%s"[^>]*/>' % rid, "", rels_xml)
+            # The rewritten sheets' own rels (tables, drawings, comments) no longer apply; parts only they
+            # led to would be left orphaned (and still declared in [Content_Types].xml), so drop them too
+            orphans = _orphaned_parts(zin, names, rels_xml, {month_part, index_part})
+            for part in calc_parts | orphans:
+                ct_xml = re.sub(r'<Override\b[^>]*PartName="/%s"[^>]*/>' % re.escape(part), "", ct_xml)
+
+            rewritten = {"xl/workbook.xml", "xl/_rels/workbook.xml.rels", "[Content_Types].xml",
+                         month_part, index_part}
+            dropped = (calc_parts | orphans | {_rels_part(p) for p in orphans}
+                       | {_rels_part(month_part), _rels_part(index_part)})
+
+            sizes: Dict[str, Tuple[int, int]] = {}
+            raw = _raw_copy_supported(zin, zout)
+            for info in zin.infolist():
+                if info.filename in rewritten or info.filename in dropped:
+                    continue
+                _copy_member(zin, zout, info, raw)
+            for n, rid in sheets:
+                part = rels.get(rid, ("", ""))[1]
+                if n in (sheet_name, index_sheet) or part not in names or part in rewritten:
+                    continue
+                sizes[n] = _sheet_size(zin, part)
+            sizes[sheet_name] = (len(df), len(df.columns))
+
+            zout.writestr("xl/workbook.xml", wb_xml)
+            zout.writestr("xl/_rels/workbook.xml.rels", rels_xml)
+            zout.writestr("[Content_Types].xml", ct_xml)
+            _write_sheet(zout, month_part, [str(c) for c in df.columns],
+                         df.itertuples(index=False, name=None), len(df))
+            index_rows = [(n, *sizes[n]) for n, _ in sheets if n in sizes]
+            _write_sheet(zout, index_part, ["Sheet", "Rows", "Columns"], index_rows, len(index_rows))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+        if src != path:
+            src.unlink(missing_ok=True)
+    return path
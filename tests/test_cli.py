@@ -0,0 +1,59 @@
+import sys
+
+import cli
+from core.fetcher import DmwClient
+from core.writer import checkpoint_path, load_state, save_state
+
+
+class FailingClient(DmwClient):
+    """9 pages of 2 rows; page 7 fails."""
+    def __init__(self, *a, **kw):
+        super().__init__("http://stub", polite_delay=0)
+
+    def fetch_page(self, jobsite, page, params=None):
+        if page == 7:
+            raise RuntimeError("HTTP 502")
+        return {"meta": {"lastPage": 9, "total": 18, "perPage": 2},
+                "data": [{"id": page * 10 + i} for i in range(2)]}
+
+
+class GrownClient(FailingClient):
+    """The dataset grew since the checkpoint: 10 pages, 20 rows."""
+    def fetch_page(self, jobsite, page, params=None):
+        self.pages = getattr(self, "pages", []) + [page]
+        return {"meta": {"lastPage": 10, "total": 20, "perPage": 2},
+                "data": [{"id": page * 10 + i} for i in range(2)]}
+
+
+def _resume_from_page_5(tmp_path, monkeypatch, client_cls):
+    cfg = {"jobsite": "Czech republic", "output_dir": str(tmp_path), "formats": ["csv"],
+           "api_base": "http://stub", "logging": {}}
+    monkeypatch.setattr(cli, "load_config", lambda _: dict(cfg))
+    monkeypatch.setattr(cli, "setup_logging_from_config", lambda *a, **kw: None)
+    monkeypatch.setattr(cli, "DmwClient", client_cls)
+    ck = checkpoint_path(tmp_path, "Czech republic", "2026-09")
+    save_state(ck, {"jobsite": "Czech republic", "month": "2026-09", "columns": [], "params": {},
+                    "filters": {}, "next_page": 5, "last_page": 9, "meta_last_page": 9, "total": 18,
+                    "per_page": 2, "rows": [{"id": i} for i in range(8)]})
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--resume"])
+    return ck
+
+
+def test_resumed_run_keeps_checkpoint_on_page_error(tmp_path, monkeypatch):
+    ck = _resume_from_page_5(tmp_path, monkeypatch, FailingClient)
+
+    assert cli.main() == cli.EXIT_PARTIAL
+    state = load_state(ck)
+    assert state["next_page"] == 7
+    assert len(state["rows"]) == 12  # 8 from before + pages 5 and 6
+    assert (tmp_path / "approved-job-orders_Czech-republic_2026-09_PARTIAL.csv").exists()
+    assert not (tmp_path / "approved-job-orders_Czech-republic_2026-09.csv").exists()
+
+
+def test_resume_refuses_when_api_meta_changed(tmp_path, monkeypatch):
+    ck = _resume_from_page_5(tmp_path, monkeypatch, GrownClient)
+    before = ck.read_text(encoding="utf-8")
+
+    assert cli.main() == 1
+    assert ck.read_text(encoding="utf-8") == before
+    assert not list(tmp_path.glob("*.csv"))
@@ -0,0 +1,51 @@
+import argparse
+import sys
+
+import cli
+from core.writer import save_state, shard_path
+
+
+def _shard(tmp_path, i, n, first, last, rows, total=6, filters=None):
+    save_state(shard_path(tmp_path, "Czech republic", "2026-09", i, n), {
+        "jobsite": "Czech republic", "month": "2026-09", "shard": i, "shards": n,
+        "first_page": first, "last_page": last, "plan_last_page": 3, "meta_last_page": 3,
+        "total": total, "per_page": 2, "columns": [], "params": {}, "filters": filters or {},
+        "complete": True, "next_page": None, "stop_reason": None, "rows": rows,
+    })
+
+
+def _merge(tmp_path):
+    cfg = {"jobsite": "Czech republic", "output_dir": str(tmp_path), "formats": ["csv"]}
+    return cli.merge(argparse.Namespace(month="2026-09", dir=None), cfg)
+
+
+def test_merge_writes_outputs_when_shards_add_up(tmp_path):
+    _shard(tmp_path, 1, 2, 1, 2, [{"id": i} for i in range(4)])
+    _shard(tmp_path, 2, 2, 3, 3, [{"id": 4}, {"id": 5}])
+    assert _merge(tmp_path) == 0
+    assert (tmp_path / "approved-job-orders_Czech-republic_2026-09.csv").exists()
+
+
+def test_merge_refuses_short_row_count(tmp_path):
+    _shard(tmp_path, 1, 2, 1, 2, [{"id": i} for i in range(4)])
+    _shard(tmp_path, 2, 2, 3, 3, [{"id": 4}])
+    assert _merge(tmp_path) == 1
+    assert not (tmp_path / "approved-job-orders_Czech-republic_2026-09.csv").exists()
+
+
+def test_merge_skips_count_check_with_client_filters(tmp_path):
+    _shard(tmp_path, 1, 2, 1, 2, [{"id": 1}], filters={"pos.cat": "A"})
+    _shard(tmp_path, 2, 2, 3, 3, [], filters={"pos.cat": "A"})
+    assert _merge(tmp_path) == 0
+
+
+
+def test_merge_month_before_or_after_subcommand(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr(cli, "load_config", lambda _: {"jobsite": "Czech republic", "output_dir": str(tmp_path)})
+    monkeypatch.setattr(cli, "setup_logging_from_config", lambda *a, **kw: None)
+    monkeypatch.setattr(cli, "merge", lambda args, cfg: seen.append(args.month) or 0)
+    for argv in (["--month", "2026-09", "merge"], ["merge", "--month", "2026-09"]):
+        monkeypatch.setattr(sys, "argv", ["cli.py", *argv])
+        assert cli.main() == 0
+    assert seen == ["2026-09", "2026-09"]
@@ -0,0 +1,16 @@
+import pytest
+
+from core.config import normalize_columns
+
+
+def test_normalize_columns_forms():
+    assert normalize_columns(["a.b=X", "c", " d = Y "]) == [("a.b", "X"), ("c", "c"), ("d", "Y")]
+    assert normalize_columns({"a": "Z", "b": ""}) == [("a", "Z"), ("b", "b")]
+    assert normalize_columns(["a", "a"]) == [("a", "a")]
+
+
+def test_normalize_columns_rejects_duplicate_alias():
+    with pytest.raises(ValueError, match="'X'"):
+        normalize_columns({"a": "X", "b": "X"})
+    with pytest.raises(ValueError, match="'b'"):
+        normalize_columns(["a=b", "b"])
@@ -0,0 +1,87 @@
+import datetime as dt
+import threading
+import time
+
+import pytest
+
+import core.fetcher
+from core.budget import FetchIncomplete, PageFailed, RunBudget, parse_deadline, parse_duration
+from core.fetcher import DmwClient, shard_range
+
+
+class StubClient(DmwClient):
+    """9 pages of 2 rows; pages in `fail` raise like a 5xx would."""
+    def __init__(self, fail=(), polite_delay=0.0, latency=0.0):
+        super().__init__("http://stub", polite_delay=polite_delay)
+        self.fail = set(fail)
+        self.latency = latency
+        self.starts = []
+        self.threads = set()
+
+    def fetch_page(self, jobsite, page, params=None):
+        self.starts.append(time.monotonic())
+        self.threads.add(threading.get_ident())
+        if self.latency:
+            time.sleep(self.latency)
+        if page in self.fail:
+            raise RuntimeError(f"HTTP 502 on page {page}")
+        return {"meta": {"lastPage": 9, "total": 18, "perPage": 2},
+                "data": [{"id": page * 10 + i} for i in range(2)]}
+
+
+def test_shard_range_tiles_all_pages():
+    assert [shard_range(10, i, 3) for i in (1, 2, 3)] == [(1, 4), (5, 7), (8, 10)]
+    assert shard_range(1, 2, 2)[0] > shard_range(1, 2, 2)[1]  # empty slice
+
+
+def test_shard_page_failure_raises_with_rows_so_far():
+    with pytest.raises(PageFailed) as exc:
+        StubClient(fail={6}).fetch_all("x", shard=(2, 3), raise_on_error=True)
+    assert exc.value.next_page == 6
+    assert [r["id"] for r in exc.value.rows] == [40, 41, 50, 51]
+
+
+def test_page_failure_without_raise_keeps_old_short_result():
+    rows = StubClient(fail={3}).fetch_all("x")
+    assert [r["id"] for r in rows] == [10, 11, 20, 21]
+
+
+def test_no_budget_stays_sequential_with_sleep_after_each_page(monkeypatch):
+    pauses = []
+    monkeypatch.setattr(core.fetcher.time, "sleep", pauses.append)
+    client = StubClient(polite_delay=0.3)
+    assert len(client.fetch_all("x")) == 18
+    assert pauses == [0.3] * 8  # after pages 2..9, never a start-spacing wait
+    assert len(client.threads) == 1
+
+
+def test_budget_caps_request_rate_across_workers():
+    client = StubClient(latency=0.05)
+    budget = RunBudget(dt.datetime.now() + dt.timedelta(seconds=0.5), max_workers=4,
+                       polite_delay=0.0, max_rps=20)
+    try:
+        client.fetch_all("x", budget=budget)
+    except FetchIncomplete:
+        pass
+    starts = sorted(client.starts[1:])  # page 1 runs before the gate is in play
+    assert len(client.threads) > 1
+    assert all(b - a >= 0.049 for a, b in zip(starts, starts[1:]))
+
+
+def test_deadline_with_utc_offset_is_local_naive():
+    now = dt.datetime.now()
+    aware = (now + dt.timedelta(hours=1)).astimezone(dt.timezone.utc)
+    d = parse_deadline(aware.isoformat(), now)
+    assert d.tzinfo is None
+    assert abs((d - now).total_seconds() - 3600) < 1
+    assert min(d, now + dt.timedelta(minutes=30)) == now + dt.timedelta(minutes=30)
+
+
+def test_past_deadline_and_zero_budget_are_rejected():
+    now = dt.datetime.now()
+    with pytest.raises(ValueError, match="not in the future"):
+        parse_deadline((now - dt.timedelta(minutes=5)).isoformat(), now)
+    with pytest.raises(ValueError, match="positive"):
+        parse_duration("0m")
+    with pytest.raises(ValueError, match="positive"):
+        parse_duration("0")
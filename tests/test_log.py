@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+import core.log
+from core.log import setup_logging, setup_logging_from_config
+
+
+@pytest.fixture(autouse=True)
+def _restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    core.log._stop_listener()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+        h.close()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def _log_failure():
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.exception("page %d failed", 7)
+    core.log._stop_listener()  # drain the queue
+
+
+def test_json_lines_keep_traceback_in_exc(tmp_path):
+    path = setup_logging(tmp_path, jobsite="Czech republic", json_lines=True)
+    _log_failure()
+    rec = json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+    assert rec["msg"] == "page 7 failed"
+    assert "ZeroDivisionError" in rec["exc"]
+    assert rec["jobsite"] == "Czech republic" and rec["run_id"]
+
+
+def test_text_log_still_has_traceback(tmp_path):
+    path = setup_logging(tmp_path)
+    _log_failure()
+    text = path.read_text(encoding="utf-8-sig")
+    assert "page 7 failed" in text and "ZeroDivisionError" in text
+
+
+def test_retention_keeps_newest(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    now = time.time()
+    for i in range(5):
+        (logs / f"run_old{i}.log").write_text("x")
+        os.utime(logs / f"run_old{i}.log", (now - 100 + i, now - 100 + i))
+    path = setup_logging(tmp_path, keep_files=3)
+    # this run's file counts toward keep_files
+    assert sorted(p.name for p in logs.glob("run_*")) == sorted([path.name, "run_old3.log", "run_old4.log"])
+
+
+def test_unknown_logging_config_keys_are_ignored(tmp_path):
+    cfg = {"jobsite": "Czech republic", "logging": {"json_lines": True, "keep_file": 3}}
+    path = setup_logging_from_config(tmp_path, cfg)
+    core.log._stop_listener()
+    recs = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert path.suffix == ".jsonl"
+    assert recs[-1]["level"] == "WARNING" and "keep_file" in recs[-1]["msg"]
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from core.transform import build_selector, to_dataframe
+
+ROWS = [
+    {"id": 1, "position": {"title": "Nurse", "cat": "A", "pay": {"min": 1, "max": 2}}, "x": 0},
+    {"id": 2, "position": None, "x": 0},
+    {"id": 3, "position": {"title": "Cook", "cat": "B", "pay": {}}, "x": 0},
+]
+
+
+def test_projected_object_path_matches_json_normalize():
+    columns = [("id", "id"), ("position", "position")]
+    projected = to_dataframe(build_selector(columns)(ROWS), columns)
+    plain = to_dataframe(ROWS).drop(columns=["x"])
+    pd.testing.assert_frame_equal(projected, plain, check_like=False)
+
+
+def test_alias_applies_to_expanded_columns_and_filters():
+    columns = [("position", "Pos"), ("id", "ID")]
+    df = to_dataframe(build_selector(columns, {"position.cat": ["a"]})(ROWS), columns)
+    assert df.columns.tolist() == ["Pos.cat", "Pos.pay.max", "Pos.pay.min", "Pos.title", "ID"]
+    assert df["Pos.title"].tolist() == ["Nurse"]
+
+
+def test_missing_path_keeps_its_column():
+    columns = [("id", "id"), ("nope.deeper", "Nope")]
+    df = to_dataframe(build_selector(columns)(ROWS), columns)
+    assert df.columns.tolist() == ["id", "Nope"] and df["Nope"].isna().all()
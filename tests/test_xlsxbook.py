@@ -0,0 +1,103 @@
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import core.xlsxbook
+from core.writer import save, workbook_path
+from core.xlsxbook import update_month_sheet
+
+
+def _members(path):
+    with zipfile.ZipFile(path) as z:
+        assert z.testzip() is None
+        return {i.filename: (i.CRC, i.compress_size) for i in z.infolist()}
+
+
+def _values(path, sheet):
+    return list(openpyxl.load_workbook(path)[sheet].iter_rows(values_only=True))
+
+
+@pytest.fixture(params=["raw", "fallback"])
+def copy_mode(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(core.xlsxbook, "_raw_copy_supported", lambda zin, zout: False)
+    return request.param
+
+
+def test_create_via_writer_then_append_and_replace(tmp_path, copy_mode):
+    aug = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b<&>", None]})
+    save(aug, tmp_path, "Czech republic", "2026-08", ["xlsx"], xlsx_mode="append")
+    path = workbook_path(tmp_path, "Czech republic")
+    assert openpyxl.load_workbook(path).sheetnames == ["Index", "2026-08"]
+
+    update_month_sheet(path, "2026-09", pd.DataFrame({"id": [4], "flag": [True]}))
+    before = _members(path)
+    update_month_sheet(path, "2026-09", pd.DataFrame({"id": [4, 5], "flag": [True, False]}))
+    after = _members(path)
+
+    changed = {name for name in before if before[name] != after.get(name)}
+    assert changed <= {"xl/worksheets/sheet1.xml", "xl/worksheets/sheet3.xml"}  # Index + 2026-09 only
+    assert _values(path, "2026-08") == [("id", "name"), (1, "a"), (2, "b<&>"), (3, None)]
+    assert _values(path, "2026-09") == [("id", "flag"), (4, True), (5, False)]
+    assert _values(path, "Index") == [("Sheet", "Rows", "Columns"), ("2026-08", 3, 2), ("2026-09", 2, 2)]
+
+
+def test_append_to_pandas_written_workbook(tmp_path, copy_mode):
+    path = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(path, engine="openpyxl") as xw:
+        pd.DataFrame({"x": range(50), "y": [f"s{i}" for i in range(50)]}).to_excel(xw, sheet_name="2026-07", index=False)
+        pd.DataFrame({"note": ["keep me"]}).to_excel(xw, sheet_name="Notes", index=False)
+    original = _members(path)
+
+    update_month_sheet(path, "2026-08", pd.DataFrame({"x": [1.5]}))
+    update_month_sheet(path, "2026-07", pd.DataFrame({"x": [9]}))  # replace a sheet pandas wrote
+
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["2026-07", "Notes", "2026-08", "Index"]
+    assert _values(path, "Notes") == [("note",), ("keep me",)]
+    assert _values(path, "2026-07") == [("x",), (9,)]
+    assert _values(path, "Index") == [("Sheet", "Rows", "Columns"), ("2026-07", 1, 1),
+                                      ("Notes", 1, 1), ("2026-08", 1, 1)]
+    # untouched parts (the Notes sheet, styles, …) keep their content; raw copy keeps the compressed bytes too
+    final = _members(path)
+    for name in ("xl/worksheets/sheet2.xml", "xl/styles.xml"):
+        assert final[name][0] == original[name][0]
+        if copy_mode == "raw":
+            assert final[name] == original[name]
+    assert pd.read_excel(path, sheet_name="2026-08")["x"].tolist() == [1.5]
+
+
+def test_raw_copy_is_available_on_this_python(tmp_path):
+    # If this fails, zipfile internals changed: updates still work via the fallback, just slower
+    src, dst = tmp_path / "a.zip", tmp_path / "b.zip"
+    with zipfile.ZipFile(src, "w") as z:
+        z.writestr("x", "y")
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w") as zout:
+        assert core.xlsxbook._raw_copy_supported(zin, zout)
+
+
+def test_replacing_sheet_drops_parts_only_it_used(tmp_path, copy_mode):
+    from openpyxl.worksheet.table import Table
+    path = tmp_path / "book.xlsx"
+    wb = openpyxl.Workbook()
+    for ws, title in ((wb.active, "2026-07"), (wb.create_sheet(), "Notes")):
+        ws.title = title
+        ws.append(["x", "y"])
+        ws.append([1, 2])
+        ws.add_table(Table(displayName=f"T_{title.replace('-', '_')}", ref="A1:B2"))
+    wb.save(path)
+    assert {"xl/tables/table1.xml", "xl/tables/table2.xml"} <= set(_members(path))
+
+    update_month_sheet(path, "2026-07", pd.DataFrame({"x": [9]}))
+
+    members = set(_members(path))
+    assert "xl/tables/table1.xml" not in members and "xl/worksheets/_rels/sheet1.xml.rels" not in members
+    assert "xl/tables/table2.xml" in members  # Notes still uses its table
+    with zipfile.ZipFile(path) as z:
+        ct = z.read("[Content_Types].xml").decode("utf-8")
+    assert "/xl/tables/table1.xml" not in ct and "/xl/tables/table2.xml" in ct
+    wb = openpyxl.load_workbook(path)
+    assert not wb["2026-07"].tables and list(wb["Notes"].tables) == ["T_Notes"]
+    assert _values(path, "2026-07") == [("x",), (9,)]